@@ -6,11 +6,21 @@
 
 import os
 import base64
-from io import StringIO as _StringIO, BytesIO
+import hashlib
+from io import BytesIO
 from datetime import datetime
+from itertools import zip_longest
 import streamlit as st
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import plotly.express as px
+import plotly.io as pio
+
+# Copy-on-Write: working frames can share buffers with session state instead of
+# being deep-copied on every rerun (always on from pandas 3.0).
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.options.mode.copy_on_write = True
 
 st.set_page_config(page_title="Travel Dashboard", page_icon="🌍", layout="wide")
 
@@ -90,13 +100,28 @@ background:
 </div>
 """, unsafe_allow_html=True)
 
-bg_bytes = None
-if os.path.exists("background.jpg"):
+@st.cache_data(show_spinner=False)
+def load_background(path: str, mtime: float, max_size=(1920, 1080)) -> bytes | None:
+    # Downscale oversized photos once (keyed on mtime) so the base64 blob sent with every page stays small
     try:
-        with open("background.jpg", "rb") as f:
-            bg_bytes = f.read()
+        with open(path, "rb") as f:
+            raw = f.read()
     except Exception:
-        bg_bytes = None
+        return None
+    try:
+        from PIL import Image
+        img = Image.open(BytesIO(raw))
+        if img.width <= max_size[0] and img.height <= max_size[1]:
+            return raw
+        img.thumbnail(max_size, Image.LANCZOS)
+        out = BytesIO(); img.convert("RGB").save(out, "JPEG", quality=80, optimize=True)
+        return out.getvalue()
+    except Exception:
+        return raw
+
+bg_bytes = None
+if os.path.exists("background.jpg"):
+    bg_bytes = load_background("background.jpg", os.path.getmtime("background.jpg"))
 inject_background(bg_bytes)
 
 # =========================
@@ -117,49 +142,100 @@ try:
     from reportlab.platypus import Paragraph, Frame
     from reportlab.lib.styles import ParagraphStyle
     from reportlab.lib.enums import TA_LEFT
+    from reportlab.graphics import renderPDF
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.graphics.charts.piecharts import Pie
     REPORTLAB_OK = True
 except Exception:
     REPORTLAB_OK = False
 
-PLOTLY_CONFIG = {"displaylogo": False, "modeBarButtonsToAdd": ["toImage"] if not KALEIDO_OK else []}
+# The modebar camera renders PNGs in the browser at the same 2x scale as the Kaleido downloads
+PLOTLY_CONFIG = {"displaylogo": False, "modeBarButtonsToAdd": ["toImage"] if not KALEIDO_OK else [],
+                 "toImageButtonOptions": {"format": "png", "scale": 2}}
+
+def show_chart(fig):
+    # A fixed uirevision lets plotly.js update the chart in place on rerun, keeping the user's zoom/pan
+    fig.update_layout(uirevision="constant")
+    st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _png_from_fig_json(fig_json: str, scale: int) -> bytes:
+    # Keyed on the figure's JSON, so unchanged charts skip Kaleido on rerun
+    return pio.from_json(fig_json).to_image(format="png", scale=scale)
 
 def fig_png_bytes(fig, scale=2):
     if not KALEIDO_OK:
         return None
     try:
-        return fig.to_image(format="png", scale=scale)
+        return _png_from_fig_json(fig.to_json(), scale)
     except Exception:
         return None
 
+@st.cache_resource(show_spinner=False, ttl=600)
+def _png_export_ok(geo: bool) -> bool:
+    # One tiny Kaleido render per chart kind (geo charts also fetch topojson), rechecked every 10 minutes.
+    # The deferred PNG render can't report back to the page, so a failing export hides its buttons instead
+    trace = {"type": "scattergeo", "lat": [0], "lon": [0]} if geo else {"type": "bar", "y": [1]}
+    try:
+        pio.to_image({"data": [trace]}, format="png", scale=1)
+        return True
+    except Exception:
+        return False
+
 def add_download(fig, filename, key):
-    png = fig_png_bytes(fig)
-    if png:
-        st.download_button("⬇️ Download PNG", data=png, file_name=filename, mime="image/png", key=key)
+    if not KALEIDO_OK or not _png_export_ok(any(tr.type == "scattergeo" for tr in fig.data)):
+        return
+    # data as a callable: Kaleido only renders when the button is clicked, not for every chart on every rerun
+    # on_click="ignore": saving a chart shouldn't rerun (and rebuild) the whole dashboard
+    fig_json = fig.to_json()
+    st.download_button("⬇️ Download PNG", data=lambda: _png_from_fig_json(fig_json, 2), file_name=filename,
+                       mime="image/png", key=key, on_click="ignore")
+
+def frame_digest(df: pd.DataFrame) -> str:
+    # Full-content hash: Streamlit's own DataFrame hasher samples the rows of big frames
+    h = hashlib.blake2b(repr((list(df.columns), df.dtypes.astype(str).tolist())).encode("utf-8"), digest_size=16)
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+# hash_funcs for cached functions taking DataFrames, so their keys see every row
+FRAME_HASH = {pd.DataFrame: frame_digest}
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _csv_bytes(df_hash: str, _df: pd.DataFrame) -> bytes:
+    # Written straight into a bytes buffer: no intermediate str copy to encode afterwards
+    buf = BytesIO(); _df.to_csv(buf, index=False, encoding="utf-8"); return buf.getvalue()
 
 def df_to_csv_bytes(df: pd.DataFrame) -> bytes:
-    buf = _StringIO(); df.to_csv(buf, index=False); return buf.getvalue().encode("utf-8")
-
-def template_trips_bytes() -> bytes:
-    df = pd.DataFrame([{
-        "trip_id": 1, "trip_name": "Tokyo Spring Break",
-        "start_date": "2023-03-15", "end_date": "2023-03-22",
-        "primary_city": "Tokyo", "country": "Japan", "lat": 35.6895, "lon": 139.6917,
-        "total_cost_usd": 2000, "transportation_cost_usd": 600, "accommodation_cost_usd": 800,
-        "activities_cost_usd": 250, "food_cost_usd": 300, "internet_speed_mbps": 45,
-    }])
-    return df_to_csv_bytes(df)
-
-def template_meals_bytes() -> bytes:
-    df = pd.DataFrame([{
-        "meal_id": 1, "trip_id": 1, "date": "2023-03-16",
-        "cuisine": "Japanese", "restaurant": "Ichiran", "dish_name": "Tonkotsu Ramen",
-        "rating_1_10": 9, "cost_usd": 12,
-    }])
-    return df_to_csv_bytes(df)
+    # Full-content key, so unchanged tables skip re-serializing
+    return _csv_bytes(frame_digest(df), df)
+
+# Example rows for the sidebar template downloads (static, so kept as ready-made CSV bytes)
+TRIPS_TEMPLATE_BYTES = (
+    b"trip_id,trip_name,start_date,end_date,primary_city,country,lat,lon,total_cost_usd,"
+    b"transportation_cost_usd,accommodation_cost_usd,activities_cost_usd,food_cost_usd,internet_speed_mbps\n"
+    b"1,Tokyo Spring Break,2023-03-15,2023-03-22,Tokyo,Japan,35.6895,139.6917,2000,600,800,250,300,45\n"
+)
+MEALS_TEMPLATE_BYTES = (
+    b"meal_id,trip_id,date,cuisine,restaurant,dish_name,rating_1_10,cost_usd\n"
+    b"1,1,2023-03-16,Japanese,Ichiran,Tonkotsu Ramen,9,12\n"
+)
 
 def next_int(series):
-    s = pd.to_numeric(series, errors="coerce").dropna().astype(int)
-    return (s.max() + 1) if len(s) else 1
+    arr = pd.to_numeric(series, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    return int(np.nanmax(arr)) + 1 if arr.size and not np.isnan(arr).all() else 1
+
+def _ensure_dt(s: pd.Series) -> pd.Series:
+    # Skip the parse when a column is already datetime (the common case after derive_frames)
+    return s if pd.api.types.is_datetime64_any_dtype(s) else pd.to_datetime(s, errors="coerce")
+
+def _ensure_num(s: pd.Series) -> pd.Series:
+    # Same idea for numbers: to_numeric copies even when the column is already numeric
+    return s if pd.api.types.is_numeric_dtype(s) else pd.to_numeric(s, errors="coerce")
+
+def _ensure_cat(s: pd.Series) -> pd.Series:
+    # Labels as str before categorising (uploads can mix numbers into a text column), so the categories
+    # always sort; blanks count as missing
+    return s.astype("string").str.strip().replace("", pd.NA).astype("category")
 
 def fmt_money(x, zero_str="$0"):
     try:
@@ -177,19 +253,43 @@ try:
 except Exception:
     GEOCODER_OK = False
 
-@st.cache_data(show_spinner=False)
+@st.cache_resource(show_spinner=False)
+def _geocoder():
+    # One client + rate limiter per process (a module-level object would be rebuilt every rerun),
+    # so the 1 req/s budget holds across lookups and sessions
+    geolocator = Nominatim(user_agent="travel_dashboard_app", timeout=6)
+    return RateLimiter(geolocator.geocode, min_delay_seconds=1, max_retries=2, error_wait_seconds=2.0)
+
+@st.cache_data(show_spinner=False, persist="disk")
+def _geocode_cached(city: str, country: str):
+    # Raises on misses/errors so only real hits get persisted across restarts
+    loc = _geocoder()(f"{city}, {country}")
+    if not loc:
+        raise LookupError(f"No match for {city}, {country}")
+    return float(loc.latitude), float(loc.longitude)
+
 def geocode_city_country(city: str, country: str):
+    city, country = (city or "").strip().lower(), (country or "").strip().lower()
     if not GEOCODER_OK or not city or not country:
         return None
     try:
-        geolocator = Nominatim(user_agent="travel_dashboard_app", timeout=6)
-        geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1)
-        loc = geocode(f"{city}, {country}")
-        if loc:
-            return float(loc.latitude), float(loc.longitude)
+        return _geocode_cached(city, country)
     except Exception:
-        pass
-    return None
+        return None
+
+def fill_missing_coords(df: pd.DataFrame) -> tuple[pd.DataFrame, int]:
+    # Geocode each distinct (city, country) among rows missing lat/lon once, then write all hits in one assignment
+    miss = df["lat"].isna() | df["lon"].isna()
+    if not miss.any():
+        return df, 0
+    pairs = pd.Series(list(zip(df.loc[miss, "primary_city"].fillna("").astype(str), df.loc[miss, "country"].fillna("").astype(str))), index=df.index[miss])
+    coord_map = {p: geocode_city_country(*p) for p in pairs.drop_duplicates()}
+    coords = pairs.map(coord_map)
+    found = coords.notna()
+    if found.any():
+        df = df.copy()
+        df.loc[found[found].index, ["lat", "lon"]] = np.array(coords[found].tolist(), dtype=float)
+    return df, int(found.sum())
 
 # =========================
 #   Helpers / Empty DFs
@@ -224,9 +324,99 @@ def empty_meals_df() -> pd.DataFrame:
         "cost_usd": pd.Series(dtype="float"),
     })
 
-def year_series(dts):
-    try: return dts.dt.year
-    except Exception: return pd.to_datetime(dts, errors="coerce").dt.year
+@st.cache_data(show_spinner=False, max_entries=8)
+def read_uploaded_csv(data: bytes, date_cols: tuple) -> pd.DataFrame:
+    # Keyed on the raw upload bytes, so a file that stays in the uploader is parsed once, not every rerun
+    try:
+        return pd.read_csv(BytesIO(data), parse_dates=list(date_cols))
+    except Exception:
+        df = pd.read_csv(BytesIO(data))
+        for c in date_cols:
+            if c in df.columns:
+                df[c] = _ensure_dt(df[c])
+        return df
+
+@st.cache_data(show_spinner=False, max_entries=8, hash_funcs=FRAME_HASH)
+def to_arrow_table(df: pd.DataFrame) -> pa.Table:
+    # st.dataframe takes Arrow directly; caching it skips the pandas->Arrow conversion on reruns
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def editor_has_changes(key: str) -> bool:
+    # data_editor keeps its pending edits as a delta dict under its key; empty means nothing to write back
+    delta = st.session_state.get(key) or {}
+    return any(delta.get(k) for k in ("edited_rows", "added_rows", "deleted_rows"))
+
+def append_row(df: pd.DataFrame, row: dict) -> pd.DataFrame:
+    # New row built in df's column order, so concat doesn't reindex. Only lossless casts to df's dtypes
+    # (dates, text, ids); a float into an integer column is left for concat to upcast, keeping the cents
+    cols = [c for c in df.columns if c in row] + [c for c in row if c not in df.columns]
+    new = pd.DataFrame.from_records([row], columns=cols)
+    casts = {c: df[c].dtype for c in cols if c in df.columns
+             and not (pd.api.types.is_integer_dtype(df[c]) and pd.api.types.is_float_dtype(new[c]))}
+    try:
+        new = new.astype(casts)
+    except (TypeError, ValueError):
+        pass
+    return pd.concat([df, new], ignore_index=True)
+
+def food_cost_by_trip(meals_df: pd.DataFrame) -> pd.Series:
+    # Per-trip meal totals in one bincount pass (expects numeric trip_id / cost_usd)
+    tid = meals_df["trip_id"].to_numpy(dtype="float64", na_value=np.nan)
+    ok = ~np.isnan(tid)
+    ids, inv = np.unique(tid[ok].astype("int64"), return_inverse=True)
+    sums = np.bincount(inv, weights=meals_df["cost_usd"].to_numpy(dtype="float64")[ok], minlength=len(ids))
+    return pd.Series(sums, index=pd.Index(ids, name="trip_id"), name="food_cost_usd_from_meals")
+
+@st.cache_data(show_spinner=False, max_entries=8, hash_funcs=FRAME_HASH)
+def trip_label_map(trips_df: pd.DataFrame) -> dict:
+    # "Name (id)" -> (trip_id, trip_name) in start-date order; built once per trips version for the pickers
+    to = trips_df.sort_values("start_date", kind="stable")
+    labels = to["trip_name"].astype(str) + " (" + to["trip_id"].astype(str) + ")"
+    return dict(zip(labels, zip(to["trip_id"], to["trip_name"])))
+
+REQUIRED_TRIP_COLS = frozenset({"trip_id","trip_name","start_date","end_date","primary_city","country","lat","lon","total_cost_usd"})
+
+@st.cache_data(show_spinner=False, max_entries=16, hash_funcs=FRAME_HASH)
+def derive_frames(trips_df: pd.DataFrame, meals_df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # Keyed on both frames' full contents, so reruns that don't touch the data skip this entirely
+    trips = trips_df.copy(deep=False)
+    meals = meals_df.copy(deep=False)
+
+    # Ensure columns
+    missing = REQUIRED_TRIP_COLS.difference(trips.columns)
+    if missing:
+        templ = empty_trips_df()
+        for col in missing: trips[col] = templ[col]
+
+    for col in ["internet_speed_mbps", "activities_cost_usd", "food_cost_usd","transportation_cost_usd", "accommodation_cost_usd"]:
+        if col not in trips.columns: trips[col] = pd.Series(dtype="float")
+
+    # Derived columns
+    # Coerce every numeric/date column in one assign instead of a setitem per column
+    num_cols = ["lat","lon","total_cost_usd","transportation_cost_usd","accommodation_cost_usd","activities_cost_usd","food_cost_usd","internet_speed_mbps"]
+    trips = trips.assign(
+        **{c: _ensure_num(trips[c]) for c in num_cols},
+        **{c: _ensure_dt(trips[c]) for c in ["start_date","end_date"]},
+    )
+    trips["days"] = ((trips["end_date"] - trips["start_date"]).dt.days.clip(lower=1) if len(trips) else pd.Series(dtype="Int64"))
+    # days is already clipped to >= 1, so no zero-guard pass is needed before dividing
+    trips["cost_per_day"] = (trips["total_cost_usd"].fillna(0) / trips["days"]).round(2)
+
+    if "rating_1_10" in meals.columns:
+        # Whole-number 1-10 ratings fit in int8; fractional ratings stay float
+        meals["rating_1_10"] = pd.to_numeric(meals["rating_1_10"], errors="coerce", downcast="integer")
+
+    # Food from meals (assigned by trip_id lookup, so reruns overwrite the previous pass's column)
+    if {"trip_id","cost_usd"}.issubset(meals.columns) and len(meals):
+        meals["cost_usd"] = _ensure_num(meals["cost_usd"]).fillna(0)
+        meals["trip_id"] = _ensure_num(meals["trip_id"]).astype("Int64")
+        trips["food_cost_usd_from_meals"] = trips["trip_id"].map(food_cost_by_trip(meals))
+    else:
+        trips["food_cost_usd_from_meals"] = pd.Series(dtype="float")
+
+    trips["food_cost_usd_final"] = (trips["food_cost_usd_from_meals"].where(trips["food_cost_usd_from_meals"].notna(), trips["food_cost_usd"])).fillna(0).clip(lower=0)
+    trips["year"] = trips["start_date"].dt.year
+    return trips, meals
 
 # ---------- Region mapping & helpers ----------
 REGION_MAP = {
@@ -303,8 +493,8 @@ st.sidebar.header("Map options")
 color_by_speed = st.sidebar.checkbox("Color markers by internet speed", value=False)
 
 st.sidebar.header("Download Templates")
-st.sidebar.download_button("Download trips.csv template", data=template_trips_bytes(), file_name="trips.csv", mime="text/csv", key="tmpl_trips")
-st.sidebar.download_button("Download meals.csv template", data=template_meals_bytes(), file_name="meals.csv", mime="text/csv", key="tmpl_meals")
+st.sidebar.download_button("Download trips.csv template", data=TRIPS_TEMPLATE_BYTES, file_name="trips.csv", mime="text/csv", key="tmpl_trips")
+st.sidebar.download_button("Download meals.csv template", data=MEALS_TEMPLATE_BYTES, file_name="meals.csv", mime="text/csv", key="tmpl_meals")
 
 # Clear
 col_clear1, col_clear2 = st.sidebar.columns(2)
@@ -323,61 +513,16 @@ if "meals_df" not in st.session_state: st.session_state.meals_df = empty_meals_d
 
 # Load uploads
 if up_trips is not None:
-    try:
-        trips_loaded = pd.read_csv(up_trips, parse_dates=["start_date", "end_date"])
-    except Exception:
-        trips_loaded = pd.read_csv(up_trips)
-        for c in ["start_date", "end_date"]:
-            if c in trips_loaded.columns:
-                trips_loaded[c] = pd.to_datetime(trips_loaded[c], errors="coerce")
+    trips_loaded = read_uploaded_csv(up_trips.getvalue(), ("start_date", "end_date"))
     st.session_state.trips_df = trips_loaded
     st.sidebar.success(f"Loaded {len(trips_loaded)} trip(s).")
 
 if up_meals is not None:
-    try:
-        meals_loaded = pd.read_csv(up_meals, parse_dates=["date"])
-    except Exception:
-        meals_loaded = pd.read_csv(up_meals)
-        if "date" in meals_loaded.columns:
-            meals_loaded["date"] = pd.to_datetime(meals_loaded["date"], errors="coerce")
+    meals_loaded = read_uploaded_csv(up_meals.getvalue(), ("date",))
     st.session_state.meals_df = meals_loaded
     st.sidebar.success(f"Loaded {len(meals_loaded)} meal(s).")
 
-trips = st.session_state.trips_df.copy()
-meals = st.session_state.meals_df.copy()
-
-# Ensure columns
-required_trip_cols = {"trip_id","trip_name","start_date","end_date","primary_city","country","lat","lon","total_cost_usd"}
-missing = required_trip_cols - set(trips.columns)
-if missing:
-    templ = empty_trips_df()
-    for col in missing: trips[col] = templ[col]
-
-for col in ["internet_speed_mbps", "activities_cost_usd", "food_cost_usd","transportation_cost_usd", "accommodation_cost_usd"]:
-    if col not in trips.columns: trips[col] = pd.Series(dtype="float")
-
-# Derived columns
-for col in ["lat","lon","total_cost_usd","transportation_cost_usd","accommodation_cost_usd","activities_cost_usd","food_cost_usd","internet_speed_mbps"]:
-    if col in trips.columns: trips[col] = pd.to_numeric(trips[col], errors="coerce")
-trips["start_date"] = pd.to_datetime(trips["start_date"], errors="coerce")
-trips["end_date"] = pd.to_datetime(trips["end_date"], errors="coerce")
-trips["days"] = ((trips["end_date"] - trips["start_date"]).dt.days.clip(lower=1) if len(trips) else pd.Series(dtype="Int64"))
-trips["cost_per_day"] = (pd.to_numeric(trips.get("total_cost_usd", pd.Series(dtype="float")), errors="coerce").fillna(0) / trips["days"].replace({0:1})).round(2)
-
-# Food from meals
-if {"trip_id","cost_usd"}.issubset(meals.columns) and len(meals):
-    meals = meals.copy()
-    meals["cost_usd"] = pd.to_numeric(meals["cost_usd"], errors="coerce").fillna(0)
-    meals["trip_id"] = pd.to_numeric(meals["trip_id"], errors="coerce").astype("Int64")
-    food_from_meals = meals.groupby("trip_id", dropna=False)["cost_usd"].sum().rename("food_cost_usd_from_meals")
-    trips = trips.merge(food_from_meals, how="left", left_on="trip_id", right_index=True)
-else:
-    trips["food_cost_usd_from_meals"] = pd.Series(dtype="float")
-
-trips["food_cost_usd"] = pd.to_numeric(trips.get("food_cost_usd"), errors="coerce")
-trips["food_cost_usd_final"] = (trips["food_cost_usd_from_meals"].where(trips["food_cost_usd_from_meals"].notna(), trips["food_cost_usd"])).fillna(0).clip(lower=0)
-trips["year"] = year_series(pd.to_datetime(trips["start_date"], errors="coerce"))
-
+trips, meals = derive_frames(st.session_state.trips_df, st.session_state.meals_df)
 st.session_state.trips_df = trips
 st.session_state.meals_df = meals
 
@@ -447,7 +592,7 @@ with tab_add_trip:
                 "accommodation_cost_usd": float(accommodation_cost_usd), "activities_cost_usd": float(activities_cost_usd),
                 "food_cost_usd": float(meal_cost_total_usd),
             }
-            st.session_state.trips_df = pd.concat([cur, pd.DataFrame([new_row])], ignore_index=True)
+            st.session_state.trips_df = append_row(cur, new_row)
             st.success(f'Trip "{trip_name}" added!')
 
 with tab_add_meal:
@@ -458,9 +603,8 @@ with tab_add_meal:
         with st.form("form_add_meal", clear_on_submit=True):
             colA, colB, colC = st.columns(3)
             with colA:
-                trip_options = st.session_state.trips_df.sort_values("start_date")[["trip_id","trip_name"]].copy()
-                trip_options["label"] = trip_options["trip_name"] + " (" + trip_options["trip_id"].astype(str) + ")"
-                trip_choice = st.selectbox("Trip *", trip_options["label"].tolist())
+                label_to_trip = trip_label_map(st.session_state.trips_df[["trip_id","trip_name","start_date"]])
+                trip_choice = st.selectbox("Trip *", list(label_to_trip))
                 cuisine = st.text_input("Cuisine *", placeholder="Japanese")
                 restaurant = st.text_input("Restaurant", placeholder="Ichiran")
             with colB:
@@ -475,8 +619,8 @@ with tab_add_meal:
                 st.error("Please complete all required fields.")
             else:
                 try:
-                    sel = trip_options.iloc[[trip_options["label"].tolist().index(trip_choice)]].iloc[0]
-                    use_trip_id = int(sel["trip_id"])
+                    use_trip_id, sel_trip_name = label_to_trip[trip_choice]
+                    use_trip_id = int(use_trip_id)
                 except Exception:
                     st.error("Could not read the selected trip. Please try again.")
                     use_trip_id = None
@@ -489,8 +633,8 @@ with tab_add_meal:
                         "cost_usd": float(cost_usd), "rating_1_10": int(rating_1_10),
                         "date": pd.to_datetime(date),
                     }
-                    st.session_state.meals_df = pd.concat([cur, pd.DataFrame([new_row])], ignore_index=True)
-                    st.success(f'Meal "{dish_name or cuisine}" added to trip "{sel["trip_name"]}"!')
+                    st.session_state.meals_df = append_row(cur, new_row)
+                    st.success(f'Meal "{dish_name or cuisine}" added to trip "{sel_trip_name}"!')
 
 with tab_edit:
     st.write("You can make quick edits below (affects this session only).")
@@ -498,61 +642,46 @@ with tab_edit:
     e1, e2 = st.columns(2)
     with e1:
         st.write("**Trips (editable)**")
-        st.session_state.trips_df = st.data_editor(st.session_state.trips_df, use_container_width=True, num_rows="dynamic", key="edit_trips")
+        edited_trips = st.data_editor(st.session_state.trips_df, use_container_width=True, num_rows="dynamic", key="edit_trips")
+        if editor_has_changes("edit_trips"): st.session_state.trips_df = edited_trips
         if GEOCODER_OK and st.button("Auto-fill missing coordinates for existing trips"):
-            df = st.session_state.trips_df.copy()
-            miss = df["lat"].isna() | df["lon"].isna(); filled = 0
-            for idx, row in df.loc[miss].iterrows():
-                city = str(row.get("primary_city") or "").strip()
-                country = str(row.get("country") or "").strip()
-                coords = geocode_city_country(city, country)
-                if coords: df.at[idx, "lat"], df.at[idx, "lon"] = coords; filled += 1
-            st.session_state.trips_df = df
+            st.session_state.trips_df, filled = fill_missing_coords(st.session_state.trips_df)
             st.success(f"Filled {filled} trip(s) with coordinates.")
         st.download_button("⬇️ Download updated trips.csv", data=df_to_csv_bytes(st.session_state.trips_df),
                            file_name="trips.csv", mime="text/csv", key="dl_trips_csv")
     with e2:
         st.write("**Meals (editable)**")
-        meals_show = st.session_state.meals_df.copy()
+        meals_show = st.session_state.meals_df
+        meals_cfg = {}
         if "date" in meals_show.columns:
-            meals_show["date"] = pd.to_datetime(meals_show["date"], errors="coerce").dt.date
-        st.session_state.meals_df = st.data_editor(meals_show, use_container_width=True, num_rows="dynamic", key="edit_meals")
-        if "date" in st.session_state.meals_df.columns:
-            st.session_state.meals_df["date"] = pd.to_datetime(st.session_state.meals_df["date"], errors="coerce")
+            meals_show = meals_show.assign(date=_ensure_dt(meals_show["date"]))
+            # Date-only picker over the datetime64 column (no per-cell datetime.date objects)
+            meals_cfg["date"] = st.column_config.DateColumn(format="YYYY-MM-DD")
+        edited_meals = st.data_editor(meals_show, use_container_width=True, num_rows="dynamic", key="edit_meals",
+                                      column_config=meals_cfg)
+        if editor_has_changes("edit_meals"):
+            if "date" in edited_meals.columns:
+                edited_meals["date"] = _ensure_dt(edited_meals["date"])
+            st.session_state.meals_df = edited_meals
         st.download_button("⬇️ Download updated meals.csv", data=df_to_csv_bytes(st.session_state.meals_df),
                            file_name="meals.csv", mime="text/csv", key="dl_meals_csv")
 
 # Refresh and re-derive
-trips = st.session_state.trips_df.copy()
-meals = st.session_state.meals_df.copy()
-for col in ["lat","lon","total_cost_usd","transportation_cost_usd","accommodation_cost_usd","activities_cost_usd","food_cost_usd","internet_speed_mbps"]:
-    if col in trips.columns: trips[col] = pd.to_numeric(trips[col], errors="coerce")
-trips["start_date"] = pd.to_datetime(trips["start_date"], errors="coerce")
-trips["end_date"] = pd.to_datetime(trips["end_date"], errors="coerce")
-trips["days"] = ((trips["end_date"] - trips["start_date"]).dt.days.clip(lower=1) if len(trips) else pd.Series(dtype="Int64"))
-trips["cost_per_day"] = (pd.to_numeric(trips.get("total_cost_usd", pd.Series(dtype="float")), errors="coerce").fillna(0) / trips["days"].replace({0:1})).round(2)
-
-if {"trip_id","cost_usd"}.issubset(meals.columns) and len(meals):
-    meals["cost_usd"] = pd.to_numeric(meals["cost_usd"], errors="coerce").fillna(0)
-    meals["trip_id"] = pd.to_numeric(meals["trip_id"], errors="coerce").astype("Int64")
-    food_from_meals = meals.groupby("trip_id", dropna=False)["cost_usd"].sum().rename("food_cost_usd_from_meals")
-    trips = trips.drop(columns=["food_cost_usd_from_meals"], errors="ignore").merge(food_from_meals, how="left", left_on="trip_id", right_index=True)
-else:
-    trips["food_cost_usd_from_meals"] = trips.get("food_cost_usd_from_meals", pd.Series(dtype="float"))
-
-trips["food_cost_usd"] = pd.to_numeric(trips.get("food_cost_usd"), errors="coerce")
-trips["food_cost_usd_final"] = (trips["food_cost_usd_from_meals"].where(trips["food_cost_usd_from_meals"].notna(), trips["food_cost_usd"])).fillna(0).clip(lower=0)
-trips["year"] = year_series(pd.to_datetime(trips["start_date"], errors="coerce"))
-
+trips, meals = derive_frames(st.session_state.trips_df, st.session_state.meals_df)
 st.session_state.trips_df = trips
 st.session_state.meals_df = meals
+# Low-cardinality labels as categoricals for the read-only views below (session frames stay
+# free-text so the editors don't turn them into fixed dropdowns)
+trips = trips.assign(country=_ensure_cat(trips["country"]))
+if "cuisine" in meals.columns: meals = meals.assign(cuisine=_ensure_cat(meals["cuisine"]))
 
 # =========================
 #   Filters & metrics
 # =========================
 st.markdown("---")
 st.sidebar.header("Filters")
-countries = sorted(trips["country"].dropna().unique().tolist()) if len(trips) else []
+# _ensure_cat leaves sorted str categories (the distinct countries), so no unique()/sort pass is needed
+countries = trips["country"].cat.categories.tolist() if len(trips) else []
 years = sorted(trips["year"].dropna().unique().tolist()) if len(trips) else []
 sel_countries = st.sidebar.multiselect("Country", countries, default=countries)
 sel_years = st.sidebar.multiselect("Year", years, default=years)
@@ -560,14 +689,21 @@ search = st.sidebar.text_input("Search trips/cities", placeholder="e.g., Tokyo")
 show_labels = st.sidebar.checkbox("Show values on bars", value=True)
 sort_by = st.sidebar.selectbox("Sort bars by", ["Start date", "Trip name", "Value"], index=0)
 
-mask = trips["country"].isin(sel_countries) & trips["year"].isin(sel_years) if len(trips) else pd.Series([], dtype=bool)
-t = trips.loc[mask].copy() if len(trips) else trips
+if not len(trips):
+    t = trips
+elif len(sel_countries) == len(countries) and len(sel_years) == len(years):
+    # Filters wide open (the default): skip both isin scans, only rows without a country/year drop out
+    t = trips.dropna(subset=["country", "year"])
+else:
+    mask = trips["country"].isin(sel_countries).to_numpy() & trips["year"].isin(sel_years).to_numpy()
+    t = trips.iloc[mask]
 if len(t) and search:
     s = search.strip()
-    search_mask = pd.Series(False, index=t.index)
-    for c in ["trip_name","primary_city"]:
-        search_mask |= t[c].astype(str).str.contains(s, case=False, na=False)
-    t = t.loc[search_mask].copy()
+    # One literal scan over name + city (NUL-joined so matches can't span the two)
+    haystack = t["trip_name"].astype(str) + "\x00" + t["primary_city"].astype(str)
+    t = t.loc[haystack.str.contains(s, case=False, regex=False, na=False)]
+# Sorted once; sections that chart by start date share this view
+t_sd = t.sort_values("start_date", kind="stable")
 
 total_spend = t["total_cost_usd"].sum() if len(t) else 0
 total_days = t["days"].sum() if len(t) else 0
@@ -586,8 +722,8 @@ with c5: st.metric("Avg Internet Speed", f"{avg_speed:.1f} Mbps" if pd.notnull(a
 with c6: st.metric("Trips ≥25 Mbps", f"{pct_good:.0f}%" if pd.notnull(pct_good) else "—")
 
 if len(t):
-    min_d = pd.to_datetime(t["start_date"], errors="coerce").min()
-    max_d = pd.to_datetime(t["end_date"], errors="coerce").max()
+    min_d = _ensure_dt(t["start_date"]).min()
+    max_d = _ensure_dt(t["end_date"]).max()
     date_range_str = f"Coverage: {min_d.strftime('%Y-%m-%d')} → {max_d.strftime('%Y-%m-%d')}" if pd.notnull(min_d) and pd.notnull(max_d) else ""
 else:
     date_range_str = ""
@@ -624,16 +760,16 @@ def build_poetic_story(trips_df: pd.DataFrame, meals_df: pd.DataFrame) -> str:
 
     best_food_trip = None
     if meals_df is not None and len(meals_df) and "rating_1_10" in meals_df.columns:
-        m = meals_df.dropna(subset=["rating_1_10"]).copy()
+        m = meals_df.dropna(subset=["rating_1_10"])
         if len(m):
-            m = m.groupby("trip_id", as_index=False)["rating_1_10"].mean().rename(columns={"rating_1_10":"avg_rating"})
+            m = m.groupby("trip_id", as_index=False).agg(avg_rating=("rating_1_10","mean"))
             m = m.merge(trips_df[["trip_id","trip_name"]], on="trip_id", how="left")
             m = m.sort_values("avg_rating", ascending=False)
             if len(m):
                 best_food_trip = f"{m.iloc[0]['trip_name']} ({m.iloc[0]['avg_rating']:.1f}/10)"
 
-    sd_min = pd.to_datetime(trips_df["start_date"], errors="coerce").min()
-    ed_max = pd.to_datetime(trips_df["end_date"], errors="coerce").max()
+    sd_min = _ensure_dt(trips_df["start_date"]).min()
+    ed_max = _ensure_dt(trips_df["end_date"]).max()
     time_window = ""
     if pd.notnull(sd_min) and pd.notnull(ed_max):
         if sd_min.year == ed_max.year:
@@ -700,6 +836,58 @@ def _hide_legends(fig):
         pass
     return fig
 
+# Shared layout for the per-trip vertical bars: one update_layout call instead of three
+# (kept on the figure rather than in a template so Streamlit's theme can't drop it)
+TRIP_BAR_LAYOUT = dict(xaxis_tickangle=-20, margin=dict(t=30), showlegend=False, coloraxis_showscale=False)
+
+# Figure builders are memoised on their (small) input frames (full-content key via FRAME_HASH): a cache
+# hit unpickles the finished figure, several times cheaper than rebuilding it through plotly.express
+@st.cache_data(show_spinner=False, max_entries=32, hash_funcs=FRAME_HASH)
+def spend_bar(df_sorted, ycol, scale, show_labels):
+    fig = px.bar(df_sorted, x="trip_name", y=ycol,
+                 labels={"trip_name":"Trip", ycol:"Amount"},
+                 color=ycol, color_continuous_scale=scale)
+    if show_labels:
+        fig.update_traces(texttemplate="$%{y:,.0f}", textposition="outside", cliponaxis=False)
+    fig.update_traces(hovertemplate="<b>%{x}</b><br>%{y:,.0f}<extra></extra>")
+    return fig.update_layout(TRIP_BAR_LAYOUT)
+
+# Horizontal per-trip bars (cost per day, speed, workability): y-axis clipping & title spacing
+HBAR_LAYOUT = dict(xaxis_title_standoff=16, yaxis_title_standoff=24, xaxis_title_font=dict(size=12),
+                   yaxis_title_font=dict(size=12), margin=dict(l=150, r=30, t=35, b=40),
+                   showlegend=False, coloraxis_showscale=False)
+
+@st.cache_data(show_spinner=False, max_entries=32, hash_funcs=FRAME_HASH)
+def trip_hbar(df_sorted, xcol, xlabel, scale, texttemplate=None, hovertemplate=None):
+    fig = px.bar(df_sorted, x=xcol, y="trip_name", orientation="h",
+                 labels={xcol: xlabel, "trip_name": "Trip"},
+                 color=xcol, color_continuous_scale=scale)
+    fig.update_traces(cliponaxis=False)
+    if texttemplate:
+        fig.update_traces(texttemplate=texttemplate, textposition="outside")
+    if hovertemplate:
+        fig.update_traces(hovertemplate=hovertemplate)
+    fig.update_xaxes(automargin=True)
+    fig.update_yaxes(automargin=True)
+    return fig.update_layout(HBAR_LAYOUT)
+
+@st.cache_data(show_spinner=False, max_entries=16, hash_funcs=FRAME_HASH)
+def trip_map(t_map, hover_data, speed_max=None):
+    # speed_max set -> markers coloured by internet speed on a 0..speed_max scale
+    if speed_max is not None:
+        fig = px.scatter_geo(t_map, lat="lat", lon="lon", hover_name="trip_name", hover_data=hover_data,
+                             projection="natural earth", color="internet_speed_mbps",
+                             color_continuous_scale="RdYlGn", range_color=[0, speed_max])
+        fig.update_traces(marker=dict(size=9, line=dict(width=1, color="black")))
+        fig.update_coloraxes(colorbar_title="Mbps")
+    else:
+        fig = px.scatter_geo(t_map, lat="lat", lon="lon", hover_name="trip_name", hover_data=hover_data,
+                             projection="natural earth")
+        fig.update_traces(marker=dict(color="red", size=9, line=dict(width=1, color="black")))
+    fig.update_geos(showcountries=True, showframe=False, landcolor="lightgray", oceancolor="lightblue", showocean=True)
+    fig.update_layout(margin=dict(l=0,r=0,t=0,b=0), height=450, template="simple_white")
+    return _hide_legends(fig)
+
 report_sections = []
 
 col1, col2 = st.columns([1.25, 1])
@@ -708,21 +896,11 @@ with col1:
     if len(t):
         hover_data = {"country": True, "total_cost_usd": True, "days": True, "lat": False, "lon": False}
         if "internet_speed_mbps" in t.columns: hover_data["internet_speed_mbps"] = True
-        if color_by_speed and "internet_speed_mbps" in t.columns and t["internet_speed_mbps"].notna().any():
-            fig_map = px.scatter_geo(t, lat="lat", lon="lon", hover_name="trip_name", hover_data=hover_data,
-                                     projection="natural earth", color="internet_speed_mbps",
-                                     color_continuous_scale="RdYlGn",
-                                     range_color=[0, max(50, t["internet_speed_mbps"].max(skipna=True))])
-            fig_map.update_traces(marker=dict(size=9, line=dict(width=1, color="black")))
-            fig_map.update_coloraxes(colorbar_title="Mbps")
-        else:
-            fig_map = px.scatter_geo(t, lat="lat", lon="lon", hover_name="trip_name", hover_data=hover_data,
-                                     projection="natural earth")
-            fig_map.update_traces(marker=dict(color="red", size=9, line=dict(width=1, color="black")))
-        fig_map.update_geos(showcountries=True, showframe=False, landcolor="lightgray", oceancolor="lightblue", showocean=True)
-        fig_map.update_layout(margin=dict(l=0,r=0,t=0,b=0), height=450, template="simple_white")
-        _hide_legends(fig_map)
-        st.plotly_chart(fig_map, use_container_width=True, config=PLOTLY_CONFIG)
+        # Only plottable rows and the columns the trace reads go into the figure JSON
+        t_map = t.loc[:, ["trip_name", *hover_data]].dropna(subset=["lat", "lon"])
+        color_speed = color_by_speed and "internet_speed_mbps" in t.columns and t["internet_speed_mbps"].notna().any()
+        fig_map = trip_map(t_map, hover_data, max(50, t["internet_speed_mbps"].max(skipna=True)) if color_speed else None)
+        show_chart(fig_map)
         add_download(fig_map, "map.png", key="dl_map")
         report_sections.append(("Where you've been", fig_map))
     else:
@@ -731,18 +909,11 @@ with col1:
 with col2:
     st.subheader("💵 Total spend per trip")
     if len(t):
-        if sort_by == "Start date": df_total = t.sort_values("start_date")
+        if sort_by == "Start date": df_total = t_sd
         elif sort_by == "Trip name": df_total = t.sort_values("trip_name")
         else: df_total = t.sort_values("total_cost_usd", ascending=False)
-        fig_cost = px.bar(df_total, x="trip_name", y="total_cost_usd",
-                          labels={"trip_name": "Trip", "total_cost_usd": "Amount"},
-                          color="total_cost_usd", color_continuous_scale="Tealgrn")
-        if show_labels:
-            fig_cost.update_traces(text=df_total["total_cost_usd"].map(lambda v: f"${v:,.0f}"), textposition="outside", cliponaxis=False)
-        fig_cost.update_traces(hovertemplate="<b>%{x}</b><br>%{y:,.0f}<extra></extra>")
-        fig_cost.update_layout(xaxis_tickangle=-20, margin=dict(t=30))
-        _hide_legends(fig_cost)
-        st.plotly_chart(fig_cost, use_container_width=True, config=PLOTLY_CONFIG)
+        fig_cost = spend_bar(df_total[["trip_name", "total_cost_usd"]], "total_cost_usd", "Tealgrn", show_labels)
+        show_chart(fig_cost)
         add_download(fig_cost, "total_spend.png", key="dl_total")
         report_sections.append(("Total spend per trip", fig_cost))
     else:
@@ -752,25 +923,10 @@ st.markdown("---")
 
 st.subheader("🏆 Cost per day leaderboard")
 if len(t):
-    df_cpd = t.sort_values("cost_per_day", ascending=True).copy()
-    fig_cpd = px.bar(df_cpd, x="cost_per_day", y="trip_name", orientation="h",
-                     labels={"cost_per_day": "Per day", "trip_name": "Trip"},
-                     color="cost_per_day", color_continuous_scale="Blugrn")
-    if show_labels:
-        fig_cpd.update_traces(text=df_cpd["cost_per_day"].map(lambda v: f"${v:,.2f}"), textposition="outside", cliponaxis=False)
-    fig_cpd.update_traces(hovertemplate="<b>%{y}</b><br>%{x:,.2f}<extra></extra>")
-    # Y-axis clipping & title spacing
-    fig_cpd.update_layout(
-        xaxis_title_standoff=16,
-        yaxis_title_standoff=24,
-        xaxis_title_font=dict(size=12),
-        yaxis_title_font=dict(size=12),
-        margin=dict(l=150, r=30, t=35, b=40),
-    )
-    fig_cpd.update_xaxes(automargin=True)
-    fig_cpd.update_yaxes(automargin=True)
-    _hide_legends(fig_cpd)
-    st.plotly_chart(fig_cpd, use_container_width=True, config=PLOTLY_CONFIG)
+    df_cpd = t.sort_values("cost_per_day", ascending=True)[["trip_name", "cost_per_day"]]
+    fig_cpd = trip_hbar(df_cpd, "cost_per_day", "Per day", "Blugrn",
+                        "$%{x:,.2f}" if show_labels else None, "<b>%{y}</b><br>%{x:,.2f}<extra></extra>")
+    show_chart(fig_cpd)
     add_download(fig_cpd, "cost_per_day.png", key="dl_cpd")
     report_sections.append(("Cost per day leaderboard", fig_cpd))
 else:
@@ -779,11 +935,33 @@ else:
 st.markdown("---")
 
 # Food Ratings (table + cuisine + avg per trip)
+MEALS_PAGE_SIZES = [50, 100, 200]
+
+@st.fragment
+def meals_table_panel(table_df):
+    # Fragment: flipping pages reruns only this table, not the charts around it
+    # Long meal logs are paged server-side so only one page is sent to the browser
+    if len(table_df) > MEALS_PAGE_SIZES[0]:
+        pg1, pg2 = st.columns(2)
+        page_size = pg1.selectbox("Rows per page", MEALS_PAGE_SIZES, key="meals_page_size")
+        n_pages = -(-len(table_df) // page_size)
+        if st.session_state.get("meals_page", 1) > n_pages:
+            st.session_state.meals_page = n_pages
+        page = pg2.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key="meals_page")
+        st.caption(f"Showing meals {(page - 1) * page_size + 1}–{min(page * page_size, len(table_df))} of {len(table_df)}")
+        table_df = table_df.iloc[(page - 1) * page_size : page * page_size]
+    # Currency formatting happens client-side via column_config instead of a per-row lambda
+    cost_cfg = {"Cost": st.column_config.NumberColumn(format="dollar")}
+    table_arrow = to_arrow_table(table_df)
+    try:
+        st.dataframe(table_arrow, use_container_width=True, hide_index=True, column_config=cost_cfg)
+    except TypeError:
+        st.dataframe(table_arrow, use_container_width=True, column_config=cost_cfg)
+
 st.subheader("🍴 Food Ratings")
 if {"trip_id","cuisine","rating_1_10"}.issubset(meals.columns) and len(meals) and len(t):
-    meals_r = meals.copy()
-    if "date" in meals_r.columns:
-        meals_r["date_str"] = pd.to_datetime(meals_r["date"], errors="coerce").dt.strftime("%Y-%m-%d")
+    # assign returns a new frame, so date_str never lands on the shared meals view
+    meals_r = meals.assign(date_str=_ensure_dt(meals["date"]).dt.strftime("%Y-%m-%d")) if "date" in meals.columns else meals
     meals_r = meals_r[meals_r["trip_id"].isin(t["trip_id"])]
     meals_r = meals_r.merge(t[["trip_id", "trip_name"]], how="left", on="trip_id")
 
@@ -794,25 +972,21 @@ if {"trip_id","cuisine","rating_1_10"}.issubset(meals.columns) and len(meals) an
         display_cols = [c for c in display_cols if c in meals_r.columns]
         display_names = {"trip_name":"Trip","date_str":"Date","cuisine":"Cuisine","restaurant":"Restaurant","dish_name":"Dish Name","rating_1_10":"Rating","cost_usd":"Cost"}
         table_df = meals_r[display_cols].sort_values(["trip_name","date_str"]).reset_index(drop=True).rename(columns=display_names)
-        if "Cost" in table_df.columns:
-            table_df["Cost"] = pd.to_numeric(table_df["Cost"], errors="coerce").map(lambda v: f"${v:,.2f}" if pd.notnull(v) else "")
-        try:
-            st.dataframe(table_df, use_container_width=True, hide_index=True)
-        except TypeError:
-            st.dataframe(table_df, use_container_width=True)
+        meals_table_panel(table_df)
 
+        # Unsorted groupby; the one ordering pass runs on the small aggregate (cuisine keeps ties alphabetical)
         top_cuisines = (meals_r.dropna(subset=["cuisine","rating_1_10"])
-                        .groupby("cuisine", as_index=False)
+                        .groupby("cuisine", as_index=False, observed=True, sort=False)
                         .agg(avg_rating=("rating_1_10","mean"), count=("rating_1_10","size"))
-                        .sort_values(["avg_rating","count"], ascending=[False,False]))
+                        .sort_values(["avg_rating","count","cuisine"], ascending=[False,False,True]))
         fig_cuisine = px.bar(top_cuisines, x="cuisine", y="avg_rating", hover_data=["count"],
                              labels={"avg_rating":"Avg Rating"}, color="avg_rating",
                              color_continuous_scale="Viridis", range_y=[0,10])
         if show_labels:
-            fig_cuisine.update_traces(text=top_cuisines["avg_rating"].map(lambda v: f"{v:.1f}"), textposition="outside", cliponaxis=False)
+            fig_cuisine.update_traces(texttemplate="%{y:.1f}", textposition="outside", cliponaxis=False)
         fig_cuisine.update_layout(xaxis_tickangle=-30, margin=dict(t=30))
         _hide_legends(fig_cuisine)
-        st.plotly_chart(fig_cuisine, use_container_width=True, config=PLOTLY_CONFIG)
+        show_chart(fig_cuisine)
         add_download(fig_cuisine, "food_ratings_cuisines.png", key="dl_cuisine")
         report_sections.append(("Food ratings — avg by cuisine", fig_cuisine))
 
@@ -830,10 +1004,9 @@ if {"trip_id","cuisine","rating_1_10"}.issubset(meals.columns) and len(meals) an
                 hovertemplate="<b>%{x}</b><br>Avg rating: %{y:.2f}/10<br>Meals counted: %{customdata[0]}<extra></extra>"
             )
             if show_labels:
-                fig_trip_rating.update_traces(text=avg_by_trip["avg_rating"].map(lambda v: f"{v:.1f}"), textposition="outside", cliponaxis=False)
-            fig_trip_rating.update_layout(xaxis_tickangle=-20, margin=dict(t=30))
-            _hide_legends(fig_trip_rating)
-            st.plotly_chart(fig_trip_rating, use_container_width=True, config=PLOTLY_CONFIG)
+                fig_trip_rating.update_traces(texttemplate="%{y:.1f}", textposition="outside", cliponaxis=False)
+            fig_trip_rating.update_layout(TRIP_BAR_LAYOUT)
+            show_chart(fig_trip_rating)
             add_download(fig_trip_rating, "avg_food_rating_per_trip.png", key="dl_trip_rating")
             report_sections.append(("Average food rating per trip", fig_trip_rating))
         else:
@@ -843,74 +1016,29 @@ else:
 
 st.markdown("---")
 
-# Cost categories
-st.subheader("🚗 Transportation spend per trip")
-if "transportation_cost_usd" in t.columns and len(t) and t["transportation_cost_usd"].notna().any():
-    df_tr = t.sort_values("start_date")
-    fig_transport = px.bar(df_tr, x="trip_name", y="transportation_cost_usd",
-                           labels={"trip_name":"Trip","transportation_cost_usd":"Amount"},
-                           color="transportation_cost_usd", color_continuous_scale="Tealgrn")
-    if show_labels:
-        fig_transport.update_traces(text=df_tr["transportation_cost_usd"].fillna(0).map(lambda v: f"${v:,.0f}"), textposition="outside", cliponaxis=False)
-    fig_transport.update_traces(hovertemplate="<b>%{x}</b><br>%{y:,.0f}<extra></extra>")
-    fig_transport.update_layout(xaxis_tickangle=-20, margin=dict(t=30))
-    _hide_legends(fig_transport)
-    st.plotly_chart(fig_transport, use_container_width=True, config=PLOTLY_CONFIG)
-    add_download(fig_transport, "transportation.png", key="dl_transport")
-    report_sections.append(("Transportation spend per trip", fig_transport))
-else:
-    st.info("Add trips with transportation costs to see this chart.")
-
-st.subheader("🍜 Food spend per trip")
-if "food_cost_usd_final" in t.columns and len(t):
-    df_food = t.sort_values("start_date")
-    fig_food = px.bar(df_food, x="trip_name", y="food_cost_usd_final",
-                      labels={"trip_name":"Trip","food_cost_usd_final":"Amount"},
-                      color="food_cost_usd_final", color_continuous_scale="Viridis")
-    if show_labels:
-        fig_food.update_traces(text=df_food["food_cost_usd_final"].map(lambda v: f"${v:,.0f}"), textposition="outside", cliponaxis=False)
-    fig_food.update_traces(hovertemplate="<b>%{x}</b><br>%{y:,.0f}<extra></extra>")
-    fig_food.update_layout(xaxis_tickangle=-20, margin=dict(t=30))
-    _hide_legends(fig_food)
-    st.plotly_chart(fig_food, use_container_width=True, config=PLOTLY_CONFIG)
-    add_download(fig_food, "food_spend.png", key="dl_food")
-    report_sections.append(("Food spend per trip", fig_food))
-else:
-    st.info("Add meals or a manual trip meal cost to see food totals per trip.")
-
-st.subheader("🏨 Accommodation spend per trip")
-if "accommodation_cost_usd" in t.columns and len(t) and t["accommodation_cost_usd"].notna().any():
-    df_ac = t.sort_values("start_date")
-    fig_accom = px.bar(df_ac, x="trip_name", y="accommodation_cost_usd",
-                       labels={"trip_name":"Trip","accommodation_cost_usd":"Amount"},
-                       color="accommodation_cost_usd", color_continuous_scale="Purples")
-    if show_labels:
-        fig_accom.update_traces(text=df_ac["accommodation_cost_usd"].fillna(0).map(lambda v: f"${v:,.0f}"), textposition="outside", cliponaxis=False)
-    fig_accom.update_traces(hovertemplate="<b>%{x}</b><br>%{y:,.0f}<extra></extra>")
-    fig_accom.update_layout(xaxis_tickangle=-20, margin=dict(t=30))
-    _hide_legends(fig_accom)
-    st.plotly_chart(fig_accom, use_container_width=True, config=PLOTLY_CONFIG)
-    add_download(fig_accom, "accommodation.png", key="dl_accom")
-    report_sections.append(("Accommodation spend per trip", fig_accom))
-else:
-    st.info("Add trips with accommodation costs to see this chart.")
-
-st.subheader("🎟️ Activities spend per trip")
-if "activities_cost_usd" in t.columns and len(t) and t["activities_cost_usd"].notna().any():
-    df_act = t.sort_values("start_date")
-    fig_activities = px.bar(df_act, x="trip_name", y="activities_cost_usd",
-                            labels={"trip_name":"Trip","activities_cost_usd":"Amount"},
-                            color="activities_cost_usd", color_continuous_scale="Sunset")
-    if show_labels:
-        fig_activities.update_traces(text=df_act["activities_cost_usd"].fillna(0).map(lambda v: f"${v:,.0f}"), textposition="outside", cliponaxis=False)
-    fig_activities.update_traces(hovertemplate="<b>%{x}</b><br>%{y:,.0f}<extra></extra>")
-    fig_activities.update_layout(xaxis_tickangle=-20, margin=dict(t=30))
-    _hide_legends(fig_activities)
-    st.plotly_chart(fig_activities, use_container_width=True, config=PLOTLY_CONFIG)
-    add_download(fig_activities, "activities_spend.png", key="dl_activities")
-    report_sections.append(("Activities spend per trip", fig_activities))
-else:
-    st.info("Add trips with activities costs to see this chart.")
+# Cost categories: (heading, column, colorscale, png name, download key, report title, empty-state text)
+SPEND_CHARTS = [
+    ("🚗 Transportation spend per trip", "transportation_cost_usd", "Tealgrn", "transportation.png", "dl_transport",
+     "Transportation spend per trip", "Add trips with transportation costs to see this chart."),
+    ("🍜 Food spend per trip", "food_cost_usd_final", "Viridis", "food_spend.png", "dl_food",
+     "Food spend per trip", "Add meals or a manual trip meal cost to see food totals per trip."),
+    ("🏨 Accommodation spend per trip", "accommodation_cost_usd", "Purples", "accommodation.png", "dl_accom",
+     "Accommodation spend per trip", "Add trips with accommodation costs to see this chart."),
+    ("🎟️ Activities spend per trip", "activities_cost_usd", "Sunset", "activities_spend.png", "dl_activities",
+     "Activities spend per trip", "Add trips with activities costs to see this chart."),
+]
+
+for heading, ycol, scale, png_name, dl_key, report_title, empty_msg in SPEND_CHARTS:
+    st.subheader(heading)
+    # Food always has a value (falls back to 0); the other categories need at least one entry
+    has_data = ycol in t.columns and len(t) and (ycol == "food_cost_usd_final" or t[ycol].notna().any())
+    if has_data:
+        fig = spend_bar(t_sd[["trip_name", ycol]], ycol, scale, show_labels)
+        show_chart(fig)
+        add_download(fig, png_name, key=dl_key)
+        report_sections.append((report_title, fig))
+    else:
+        st.info(empty_msg)
 
 st.markdown("---")
 
@@ -924,29 +1052,27 @@ if len(t):
     with st.form("form_set_speed"):
         colx, coly = st.columns([2, 1])
         with colx:
-            trip_choices = t.sort_values("start_date")[["trip_id","trip_name"]].copy()
-            trip_choices["label"] = trip_choices["trip_name"] + " (" + trip_choices["trip_id"].astype(str) + ")"
-            sel_label = st.selectbox("Select trip to set internet speed", trip_choices["label"].tolist())
+            label_to_trip = trip_label_map(t_sd[["trip_id","trip_name","start_date"]])
+            sel_label = st.selectbox("Select trip to set internet speed", list(label_to_trip))
         with coly:
             new_speed = st.number_input("Average Internet Speed (Mbps)", min_value=0.0, step=1.0, value=0.0)
         do_set = st.form_submit_button("Save speed")
     if do_set:
         try:
-            row = trip_choices.iloc[[trip_choices["label"].tolist().index(sel_label)]].iloc[0]
-            tid = int(row["trip_id"])
+            tid, sel_trip_name = label_to_trip[sel_label]
+            tid = int(tid)
             idx = st.session_state.trips_df.index[st.session_state.trips_df["trip_id"] == tid]
             if len(idx):
                 st.session_state.trips_df.loc[idx, "internet_speed_mbps"] = float(new_speed)
-                st.success(f'Saved {new_speed:.1f} Mbps for trip "{row["trip_name"]}".')
+                st.success(f'Saved {new_speed:.1f} Mbps for trip "{sel_trip_name}".')
             else:
                 st.warning("Could not locate that trip in the current table.")
         except Exception:
             st.error("Failed to save speed. Please try again.")
 
-t = st.session_state.trips_df.copy()
+t = st.session_state.trips_df
 if len(t):
-    t["start_date"] = pd.to_datetime(t["start_date"], errors="coerce")
-    t["end_date"] = pd.to_datetime(t["end_date"], errors="coerce")
+    t = t.assign(start_date=_ensure_dt(t["start_date"]), end_date=_ensure_dt(t["end_date"]))
 
 if len(t) and "internet_speed_mbps" in t.columns and t["internet_speed_mbps"].notna().any():
     spd_all = t["internet_speed_mbps"].dropna()
@@ -958,30 +1084,16 @@ if len(t) and "internet_speed_mbps" in t.columns and t["internet_speed_mbps"].no
 
     st.write("**Average Internet Speed by Trip**")
     df_net = t.dropna(subset=["internet_speed_mbps"]).sort_values("internet_speed_mbps", ascending=False)
-    fig_net = px.bar(df_net, x="internet_speed_mbps", y="trip_name", orientation="h",
-                     labels={"internet_speed_mbps":"Mbps","trip_name":"Trip"},
-                     color="internet_speed_mbps", color_continuous_scale="RdYlGn")
-    fig_net.update_traces(hovertemplate="<b>%{y}</b><br>%{x:.1f} Mbps<extra></extra>")
-    # Y-axis clipping & title spacing
-    fig_net.update_layout(
-        xaxis_title_standoff=16,
-        yaxis_title_standoff=24,
-        xaxis_title_font=dict(size=12),
-        yaxis_title_font=dict(size=12),
-        margin=dict(l=150, r=30, t=35, b=40),
-    )
-    fig_net.update_xaxes(automargin=True)
-    fig_net.update_yaxes(automargin=True)
-    fig_net.update_traces(cliponaxis=False)
-    _hide_legends(fig_net)
-    st.plotly_chart(fig_net, use_container_width=True, config=PLOTLY_CONFIG)
+    fig_net = trip_hbar(df_net[["trip_name", "internet_speed_mbps"]], "internet_speed_mbps", "Mbps", "RdYlGn",
+                        hovertemplate="<b>%{y}</b><br>%{x:.1f} Mbps<extra></extra>")
+    show_chart(fig_net)
     add_download(fig_net, "internet_speed.png", key="dl_net_dn")
     report_sections.append(("Average Internet Speed by Trip", fig_net))
 
     st.write("**Average internet speed by country**")
     country_speed = (t.dropna(subset=["country","internet_speed_mbps"])
-                       .groupby("country", as_index=False)["internet_speed_mbps"].mean()
-                       .rename(columns={"internet_speed_mbps":"avg_speed_mbps"})
+                       .groupby("country", as_index=False, observed=True, sort=False)
+                       .agg(avg_speed_mbps=("internet_speed_mbps","mean"))
                        .sort_values("avg_speed_mbps", ascending=False))
     if len(country_speed):
         fig_country = px.bar(country_speed, x="country", y="avg_speed_mbps",
@@ -989,7 +1101,7 @@ if len(t) and "internet_speed_mbps" in t.columns and t["internet_speed_mbps"].no
                              color="avg_speed_mbps", color_continuous_scale="RdYlGn")
         fig_country.update_layout(margin=dict(t=30))
         _hide_legends(fig_country)
-        st.plotly_chart(fig_country, use_container_width=True, config=PLOTLY_CONFIG)
+        show_chart(fig_country)
         add_download(fig_country, "country_avg_speed.png", key="dl_country_speed")
         report_sections.append(("Average internet speed by country", fig_country))
 
@@ -997,32 +1109,20 @@ if len(t) and "internet_speed_mbps" in t.columns and t["internet_speed_mbps"].no
     st.caption("We normalize each trip’s internet speed and affordability (1 / cost per day), then combine them.  \nScore = 100 × (0.6 × speed_norm + 0.4 × affordability_norm).")
 
     st.write("**Top 5 remote-work destinations (workability score)**")
-    score_df = t.dropna(subset=["internet_speed_mbps", "cost_per_day"]).copy()
+    score_df = t.dropna(subset=["internet_speed_mbps", "cost_per_day"])
     if len(score_df) >= 1:
-        sp_min, sp_max = score_df["internet_speed_mbps"].min(), score_df["internet_speed_mbps"].max()
-        score_df["speed_norm"] = (score_df["internet_speed_mbps"] - sp_min) / (sp_max - sp_min) if sp_max > sp_min else 1.0
-        score_df["inv_cost"] = 1.0 / score_df["cost_per_day"].replace(0, pd.NA)
-        score_df["inv_cost"] = score_df["inv_cost"].fillna(score_df["inv_cost"].max() if score_df["inv_cost"].notna().any() else 1.0)
-        cmin, cmax = score_df["inv_cost"].min(), score_df["inv_cost"].max()
-        score_df["afford_norm"] = (score_df["inv_cost"] - cmin) / (cmax - cmin) if cmax > cmin else 1.0
-        score_df["workability_score"] = 100 * (0.6 * score_df["speed_norm"] + 0.4 * score_df["afford_norm"])
-        top5 = score_df.sort_values("workability_score", ascending=False).head(5)
-        fig_work = px.bar(top5, x="workability_score", y="trip_name", orientation="h",
-                          labels={"workability_score":"Score","trip_name":"Trip"},
-                          color="workability_score", color_continuous_scale="RdYlGn")
-        # Y-axis clipping & title spacing
-        fig_work.update_layout(
-            xaxis_title_standoff=16,
-            yaxis_title_standoff=24,
-            xaxis_title_font=dict(size=12),
-            yaxis_title_font=dict(size=12),
-            margin=dict(l=150, r=30, t=35, b=40),
-        )
-        fig_work.update_xaxes(automargin=True)
-        fig_work.update_yaxes(automargin=True)
-        fig_work.update_traces(cliponaxis=False)
-        _hide_legends(fig_work)
-        st.plotly_chart(fig_work, use_container_width=True, config=PLOTLY_CONFIG)
+        # Plain numpy on the two input columns; one column written back at the end
+        spd = score_df["internet_speed_mbps"].to_numpy(dtype="float64")
+        cpd = score_df["cost_per_day"].to_numpy(dtype="float64")
+        speed_norm = (spd - spd.min()) / np.ptp(spd) if np.ptp(spd) > 0 else np.ones_like(spd)
+        with np.errstate(divide="ignore"):
+            inv_cost = np.where(cpd == 0, np.nan, 1.0 / cpd)
+        inv_cost = np.where(np.isnan(inv_cost), np.nanmax(inv_cost) if (~np.isnan(inv_cost)).any() else 1.0, inv_cost)
+        afford_norm = (inv_cost - inv_cost.min()) / np.ptp(inv_cost) if np.ptp(inv_cost) > 0 else np.ones_like(inv_cost)
+        score_df = score_df.assign(workability_score=100 * (0.6 * speed_norm + 0.4 * afford_norm))
+        top5 = score_df.nlargest(5, "workability_score")
+        fig_work = trip_hbar(top5[["trip_name", "workability_score"]], "workability_score", "Score", "RdYlGn")
+        show_chart(fig_work)
         add_download(fig_work, "top_remote_work_destinations.png", key="dl_workability")
         report_sections.append(("Top 5 remote-work destinations (workability score)", fig_work))
 else:
@@ -1082,21 +1182,13 @@ def make_multi_trip_snapshots(trips_df: pd.DataFrame, meals_df: pd.DataFrame) ->
 # =========================
 #   PDF Export (mini donut on page 1)
 # =========================
-def build_pdf_report(fig_sections, cover, summary_pages=None, mini_chart_png=None):
+def build_pdf_report(fig_sections, cover, summary_pages=None, mini_chart=None):
     if not (KALEIDO_OK and REPORTLAB_OK):
         return None
 
     buf = BytesIO()
 
-    from reportlab.pdfgen import canvas as rl_canvas
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.utils import ImageReader
-    from reportlab.lib.colors import HexColor
-    from reportlab.platypus import Paragraph, Frame
-    from reportlab.lib.styles import ParagraphStyle
-    from reportlab.lib.enums import TA_LEFT
-
-    c = rl_canvas.Canvas(buf, pagesize=A4)
+    c = rl_canvas.Canvas(buf, pagesize=A4, pageCompression=1)
     width, height = A4
     margin = 24
     navy = HexColor("#0F2557")
@@ -1119,14 +1211,15 @@ def build_pdf_report(fig_sections, cover, summary_pages=None, mini_chart_png=Non
     chip_w = (width - 2*margin - 16) / 3.0
     chip_h = 38
     rows_y = [height - banner_h - 16 - chip_h, height - banner_h - 16 - 2*(chip_h + 8)]
-    labels = list(chips.keys()); values = [chips[k] for k in labels]
-    def _chip(x, y, w, h, label, value):
-        c.setFillColor(light_navy); c.roundRect(x, y, w, h, 7, fill=1, stroke=0)
-        c.setFillColor(HexColor("#DDE4F2")); c.setFont("Helvetica", 8); c.drawString(x+8, y+h-12, label)
-        c.setFillColor(HexColor("#FFFFFF")); c.setFont("Helvetica-Bold", 14); c.drawString(x+8, y+h-28, str(value))
-    for i, (lab, val) in enumerate(zip(labels, values)):
-        r = 0 if i < 3 else 1; col = i % 3
-        x = margin + col * (chip_w + 8); y = rows_y[r]; _chip(x, y, chip_w, chip_h, lab, val)
+    labels = list(chips.keys())[:3 * len(rows_y)]; values = [chips[k] for k in labels]
+    positions = [(margin + (i % 3) * (chip_w + 8), rows_y[i // 3]) for i in range(len(labels))]
+    # One fill/font change per layer instead of per chip
+    c.setFillColor(light_navy)
+    for x, y in positions: c.roundRect(x, y, chip_w, chip_h, 7, fill=1, stroke=0)
+    c.setFillColor(HexColor("#DDE4F2")); c.setFont("Helvetica", 8)
+    for (x, y), lab in zip(positions, labels): c.drawString(x+8, y+chip_h-12, lab)
+    c.setFillColor(HexColor("#FFFFFF")); c.setFont("Helvetica-Bold", 14)
+    for (x, y), val in zip(positions, values): c.drawString(x+8, y+chip_h-28, str(val))
 
     # Overview box
     box_y = rows_y[1] - 92 if len(labels) > 3 else rows_y[0] - 92
@@ -1154,14 +1247,13 @@ def build_pdf_report(fig_sections, cover, summary_pages=None, mini_chart_png=Non
         exec_para = Paragraph(exec_text, style=body_style)
         exec_frame.addFromList([exec_para], c)
 
-    if mini_chart_png:
-        img = ImageReader(BytesIO(mini_chart_png))
-        target_w, target_h = 170, 170
+    if mini_chart is not None:
+        target_w, target_h = mini_chart.width, mini_chart.height
         x = margin + (width - 2*margin - target_w) / 2.0
         y = margin + summ_h + 14
         c.setFillColor(navy); c.setFont("Helvetica-Bold", 10)
         c.drawCentredString(margin + (width - 2*margin)/2.0, y + target_h + 12, "Trips by Region")
-        c.drawImage(img, x, y, width=target_w, height=target_h, preserveAspectRatio=True, mask='auto')
+        renderPDF.draw(mini_chart, c, x, y)
 
     if summary_pages and len(summary_pages) >= 1:
         first_summary = summary_pages[0]
@@ -1209,28 +1301,79 @@ def build_pdf_report(fig_sections, cover, summary_pages=None, mini_chart_png=Non
         c.drawImage(img, x_draw, y_top - title_h - 6 - draw_h, width=draw_w, height=draw_h,
                     preserveAspectRatio=True, mask='auto')
 
-    i = 0
-    while i < len(fig_sections):
-        y_top_first = height - margin
-        title1, fig1 = fig_sections[i]
-        draw_chart_block_centered(title1, fig1, y_top_first)
+    y_div = height - margin - slot_h - gap_y/2.0
+    y_top_second = height - margin - slot_h - gap_y
+    sections = iter(fig_sections)
+    for first, second in zip_longest(sections, sections):
+        draw_chart_block_centered(*first, height - margin)
 
         # Divider line between stacked visuals
         c.setStrokeColor(divider_color); c.setLineWidth(0.5)
-        y_div = height - margin - slot_h - gap_y/2.0
         c.line(margin, y_div, width - margin, y_div)
 
-        if i + 1 < len(fig_sections):
-            y_top_second = height - margin - slot_h - gap_y
-            title2, fig2 = fig_sections[i + 1]
-            draw_chart_block_centered(title2, fig2, y_top_second)
-            i += 2
-        else:
-            i += 1
+        if second is not None:
+            draw_chart_block_centered(*second, y_top_second)
         c.showPage()
 
     c.save(); buf.seek(0); return buf.getvalue()
 
+def region_donut_drawing(trips_df: pd.DataFrame, size=170):
+    # Mini donut for page 1 (clean look), drawn as ReportLab vector shapes — no Kaleido round-trip
+    rc = region_counts_df(trips_df)
+    if not len(rc):
+        return None
+    palette = ["#b9935a", "#d9c2a3", "#8c6e48", "#c7aa79", "#a67c52", "#e0ceb0", "#70543a", "#c9ab85"]
+    counts = rc["count"].astype(float).tolist()
+    total = sum(counts)
+    pie = Pie()
+    pie.x = pie.y = 4; pie.width = pie.height = size - 8
+    pie.data = counts
+    pie.labels = [f"{100 * v / total:.0f}%" for v in counts]
+    pie.innerRadiusFraction = 0.55
+    pie.simpleLabels = 1
+    pie.slices.labelRadius = 0.78
+    pie.slices.fontName = "Helvetica"; pie.slices.fontSize = 7
+    pie.slices.strokeColor = HexColor("#FFFFFF"); pie.slices.strokeWidth = 0.8
+    for i in range(len(counts)):
+        col = HexColor(palette[i % len(palette)])
+        pie.slices[i].fillColor = col
+        # Light text on the darker browns, dark text elsewhere
+        light_bg = (0.299 * col.red + 0.587 * col.green + 0.114 * col.blue) > 0.6
+        pie.slices[i].fontColor = HexColor("#3B2F22") if light_bg else HexColor("#FFFFFF")
+    d = Drawing(size, size); d.add(pie)
+    return d
+
+def report_fingerprint(frames, options, cover, summary_pages) -> str:
+    # Identifies the report by its inputs (data frames + chart options), so a prepared PDF is reused until they
+    # change. Not the rendered figures: their JSON differs between a figure-cache miss and hit of the same chart
+    h = hashlib.blake2b(repr((options, cover, summary_pages)).encode("utf-8"), digest_size=16)
+    for df in frames:
+        h.update(frame_digest(df).encode("ascii"))
+    return h.hexdigest()
+
+@st.fragment
+def pdf_export_panel(fig_sections, cover, summary_pages, trips_df, report_key):
+    # Fragment: preparing/downloading the PDF reruns only this panel, not every chart above
+    # Built only on request; kept in session state until the report inputs change
+    if st.button("📄 Prepare PDF Report", width="stretch", key="prep_pdf"):
+        with st.spinner("Building PDF report…"):
+            pdf_bytes = build_pdf_report(fig_sections, cover, summary_pages=summary_pages,
+                                         mini_chart=region_donut_drawing(trips_df))
+        st.session_state.pdf_report = (report_key, pdf_bytes)
+    prepared_key, pdf_bytes = st.session_state.get("pdf_report", (None, None))
+    if prepared_key == report_key:
+        if pdf_bytes:
+            st.download_button(
+                "📄 Download PDF Report",
+                data=pdf_bytes,
+                file_name=f"travel_dashboard_report_{datetime.now().strftime('%Y%m%d')}.pdf",
+                mime="application/pdf",
+                width="stretch",
+                on_click="ignore",
+            )
+        else:
+            st.warning("Could not build PDF report. Check `kaleido` and `reportlab` are installed and try again.")
+
 # =========================
 #   PDF Export
 # =========================
@@ -1243,25 +1386,6 @@ elif len(t) > 1:
     snapshots_text = make_multi_trip_snapshots(t, meals)
     summary_pages.append({"title": "Trip Snapshots", "paragraph": snapshots_text})
 
-# Mini donut for page 1 (clean look)
-mini_chart_png = None
-try:
-    rc = region_counts_df(t)
-    if len(rc):
-        palette = ["#b9935a", "#d9c2a3", "#8c6e48", "#c7aa79", "#a67c52", "#e0ceb0", "#70543a", "#c9ab85"]
-        fig_region = px.pie(rc, names="region", values="count", hole=0.55,
-                            template="simple_white", color_discrete_sequence=palette)
-        fig_region.update_traces(
-            textinfo="percent",
-            insidetextorientation="radial",
-            hovertemplate="%{label}: %{value} trip(s) — %{percent}<extra></extra>",
-            pull=0.01,
-        )
-        fig_region.update_layout(margin=dict(l=10, r=10, t=10, b=10), height=260, width=260, showlegend=False)
-        mini_chart_png = fig_png_bytes(fig_region, scale=2)
-except Exception:
-    mini_chart_png = None
-
 if not KALEIDO_OK:
     st.info("To enable PNG/PDF exports, ensure `kaleido` is installed in requirements.txt.")
 elif not REPORTLAB_OK:
@@ -1269,17 +1393,9 @@ elif not REPORTLAB_OK:
 elif len(report_sections) == 0:
     st.info("Add some data to generate charts before exporting a PDF report.")
 else:
-    pdf_bytes = build_pdf_report(report_sections, cover_info, summary_pages=summary_pages, mini_chart_png=mini_chart_png)
-    if pdf_bytes:
-        st.download_button(
-            "📄 Download PDF Report",
-            data=pdf_bytes,
-            file_name=f"travel_dashboard_report_{datetime.now().strftime('%Y%m%d')}.pdf",
-            mime="application/pdf",
-            use_container_width=True,
-        )
-    else:
-        st.warning("Could not build PDF report. Check `kaleido` and `reportlab` are installed and try again.")
+    # Filtered trips, the full trips table (Digital Nomad charts) and meals, plus the chart options
+    report_key = report_fingerprint((t_sd, t, meals), (show_labels, sort_by, color_by_speed), cover_info, summary_pages)
+    pdf_export_panel(report_sections, cover_info, summary_pages, t, report_key)
 
 # =========================
 #   Footer
@@ -0,0 +1,83 @@
+import os
+import runpy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def app():
+    # Streamlit runs the script in bare mode here (no session, so no data), which leaves its helpers defined
+    cwd = os.getcwd()
+    os.chdir(APP_DIR)
+    try:
+        yield runpy.run_path(os.path.join(APP_DIR, "app.py"))
+    finally:
+        os.chdir(cwd)
+
+
+def test_fill_missing_coords_geocodes_each_pair_once(app, monkeypatch):
+    calls = []
+
+    def fake_geocode(city, country):
+        calls.append((city, country))
+        return {"Lima": (-12.05, -77.04), "Oslo": (59.91, 10.75)}.get(city)
+
+    monkeypatch.setitem(app["fill_missing_coords"].__globals__, "geocode_city_country", fake_geocode)
+    df = pd.DataFrame({
+        "primary_city": ["Lima", "Paris", "Lima", "Oslo", "Nowhere"],
+        "country": ["Peru", "France", "Peru", "Norway", "Atlantis"],
+        "lat": [np.nan, 48.86, np.nan, 59.0, np.nan],
+        "lon": [np.nan, 2.35, np.nan, np.nan, np.nan],
+    })
+    out, filled = app["fill_missing_coords"](df)
+
+    assert filled == 3
+    assert sorted(calls) == [("Lima", "Peru"), ("Nowhere", "Atlantis"), ("Oslo", "Norway")]
+    assert out.loc[[0, 2], ["lat", "lon"]].to_numpy().tolist() == [[-12.05, -77.04], [-12.05, -77.04]]
+    assert out.loc[3, ["lat", "lon"]].tolist() == [59.91, 10.75]
+    assert out.loc[1, ["lat", "lon"]].tolist() == [48.86, 2.35]
+    assert out.loc[4, ["lat", "lon"]].isna().all()
+    assert df["lat"].isna().sum() == 3  # input left untouched
+
+
+def test_fill_missing_coords_noop_when_complete(app):
+    df = pd.DataFrame({"primary_city": ["Lima"], "country": ["Peru"], "lat": [-12.05], "lon": [-77.04]})
+    out, filled = app["fill_missing_coords"](df)
+    assert filled == 0 and out is df
+
+
+def test_append_row_keeps_fractional_cost_in_int_column(app):
+    df = pd.DataFrame({"trip_id": [1, 2], "total_cost_usd": [1200, 800]})  # integer costs, as read from a CSV
+    out = app["append_row"](df, {"trip_id": 3, "total_cost_usd": 1234.56})
+    assert out["total_cost_usd"].tolist() == [1200, 800, 1234.56]
+    assert out["trip_id"].dtype == df["trip_id"].dtype
+
+
+def test_append_row_keeps_session_dtypes(app):
+    meals = app["empty_meals_df"]()
+    row = {"meal_id": 1, "trip_id": 7, "cuisine": "Thai", "restaurant": "Soi 38", "dish_name": "Khao soi",
+           "cost_usd": 10.75, "rating_1_10": 9, "date": pd.Timestamp("2024-02-01")}
+    out = app["append_row"](meals, row)
+    assert out.dtypes.to_dict() == meals.dtypes.to_dict()
+    assert list(out.columns) == list(meals.columns)
+    assert out.loc[0, "cost_usd"] == 10.75
+
+
+def test_food_cost_by_trip_matches_groupby(app):
+    meals = pd.DataFrame({
+        "trip_id": pd.array([3, 1, None, 3, 2, 1, 3], dtype="Int64"),
+        "cost_usd": [12.5, 8.0, 99.0, 0.25, 40.0, 1.75, 7.0],
+    })
+    # The groupby this replaced; its NaN-trip group never matched a trip
+    expected = meals.groupby("trip_id", dropna=False)["cost_usd"].sum().rename("food_cost_usd_from_meals")
+    got = app["food_cost_by_trip"](meals)
+    expected_ids = expected.loc[expected.index.notna()]
+    expected_ids.index = expected_ids.index.astype("int64")
+    pd.testing.assert_series_equal(got, expected_ids)
+
+    trip_ids = pd.Series([1, 2, 3, 4], dtype="Int64")
+    pd.testing.assert_series_equal(trip_ids.map(got), trip_ids.map(expected), check_dtype=False)